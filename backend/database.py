@@ -4,7 +4,7 @@ Configuration de la base de données SQLite
 from __future__ import annotations
 
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -13,12 +13,41 @@ DB_PATH = os.path.join(os.path.dirname(__file__), "data", "app.db")
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
 # Création du moteur SQLAlchemy
+# Pool explicite: évite les timeouts "QueuePool limit reached" sous forte
+# charge concurrente (sessions créées par Depends sur chaque requête)
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Nécessaire pour SQLite
+    connect_args={
+        "check_same_thread": False,  # Nécessaire pour SQLite
+        "timeout": 30,  # Attente max (s) sur le verrou SQLite côté driver
+    },
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=True,  # Écarte les connexions mortes avant usage
+    pool_recycle=3600,
     echo=False  # Mettre True pour voir les requêtes SQL
 )
 
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure SQLite pour la performance sur chaque nouvelle connexion.
+
+    ⚡ WAL: les commits de /query et /upload ne bloquent plus les lectures
+    concurrentes (ex: /stats), et synchronous=NORMAL économise un fsync
+    par commit sans risque de corruption en mode WAL.
+    """
+    cursor = dbapi_connection.cursor()
+    if DB_PATH != ":memory:":
+        # WAL n'a pas de sens pour une base en mémoire
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-64000")  # 64 MB de cache de pages
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped I/O
+    cursor.close()
+
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -32,6 +61,13 @@ def get_db():
         @app.get("/")
         def route(db: Session = Depends(get_db)):
             ...
+
+    Une Session neuve par requête: FastAPI peut exécuter l'entrée et la
+    sortie d'une dependency sync dans des threads différents du pool, un
+    registry scoped_session par thread fermerait donc la session d'une
+    autre requête en vol. L'objet Session est léger — ce sont les
+    connexions qui coûtent, et elles sont réutilisées via le pool du
+    moteur.
     """
     db = SessionLocal()
     try:
@@ -39,6 +75,14 @@ def get_db():
     finally:
         db.close()
 
+def optimize_db():
+    """Exécute `PRAGMA optimize;` (mise à jour des stats du query planner).
+
+    À appeler périodiquement (voir la tâche de fond dans main.py).
+    """
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA optimize")
+
 def init_db():
     """Initialise la base de données (créer les tables)."""
     # Créer le dossier data s'il n'existe pas
@@ -49,4 +93,57 @@ def init_db():
     
     # Créer toutes les tables
     Base.metadata.create_all(bind=engine)
+
+    # ⚙️ Mise à niveau légère des bases existantes: create_all ne modifie
+    # jamais une table déjà créée, or /query dépend de la colonne
+    # llm_used et l'upsert APIKeyUsage exige l'index unique
+    # (tenant_id, api_key). Tout est idempotent (IF NOT EXISTS / test de
+    # présence de colonne), donc sans effet sur une base neuve.
+    with engine.begin() as conn:
+        columns = {
+            row[1]
+            for row in conn.exec_driver_sql("PRAGMA table_info(query_logs)")
+        }
+        if "llm_used" not in columns:
+            conn.exec_driver_sql(
+                "ALTER TABLE query_logs ADD COLUMN llm_used BOOLEAN DEFAULT 0"
+            )
+            # Backfill unique: avant la colonne dédiée, la vérité vivait
+            # dans le JSON de métadonnées — sans ça, /stats compterait 0
+            # requête LLM pour tout l'historique pré-migration
+            conn.exec_driver_sql(
+                "UPDATE query_logs SET llm_used = 1 "
+                "WHERE query_metadata LIKE '%\"llm_used\": true%'"
+            )
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_apikey_tenant_key "
+            "ON api_key_usage (tenant_id, api_key)"
+        )
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_querylog_tenant_created "
+            "ON query_logs (tenant_id, created_at)"
+        )
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_query_logs_llm_used "
+            "ON query_logs (llm_used)"
+        )
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_query_logs_created_at "
+            "ON query_logs (created_at)"
+        )
+        # Horodatages NULL laissés par les insertions faites avant que les
+        # defaults Python n'existent (server_default = DDL uniquement)
+        conn.exec_driver_sql(
+            "UPDATE tenant_documents SET indexed_at = CURRENT_TIMESTAMP "
+            "WHERE indexed_at IS NULL"
+        )
+        conn.exec_driver_sql(
+            "UPDATE tenant_documents SET updated_at = CURRENT_TIMESTAMP "
+            "WHERE updated_at IS NULL"
+        )
+        conn.exec_driver_sql(
+            "UPDATE api_key_usage SET created_at = CURRENT_TIMESTAMP "
+            "WHERE created_at IS NULL"
+        )
+
     print(f"✅ Base de données initialisée: {DB_PATH}")
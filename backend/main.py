@@ -1,36 +1,135 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import os
+import shutil
 import time
 from datetime import datetime
 from fastapi import FastAPI, Header, HTTPException, Depends, UploadFile, File
-from pydantic import BaseModel, Field
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import case, func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from .tenants import resolve_tenant
-from .search import MultiTenantSearch, build_llm_answer
-from .database import get_db, init_db
+from .search import MultiTenantSearch, build_llm_answer_async
+from .database import SessionLocal, get_db, init_db, optimize_db
 from .models import QueryLog, APIKeyUsage, TenantDocument
 
 
 APP_DIR = os.path.dirname(__file__)
-DATA_DIR = os.path.join(APP_DIR, "data")  
+DATA_DIR = os.path.join(APP_DIR, "data")
 
-search_engine = MultiTenantSearch(base_dir=DATA_DIR)
-# Preload the two tenants (optional, but nice for faster first request)
-search_engine.load_tenant("tenantA")
-search_engine.load_tenant("tenantB")
+@functools.lru_cache(maxsize=1)
+def get_search_engine() -> MultiTenantSearch:
+    """Moteur de recherche multi-tenant, construit à la première demande.
 
-app = FastAPI(title="Multi-tenant SaaS Search API", version="2.0.0")
+    Lazy init: importer le module (tests, scripts) ne paie plus le coût
+    d'indexation; le préchargement des tenants se fait au startup.
+    """
+    return MultiTenantSearch(base_dir=DATA_DIR)
+
+# ORJSONResponse: sérialisation JSON en Rust, nettement plus rapide que
+# json stdlib pour les réponses /query (extraits de chunks volumineux)
+app = FastAPI(
+    title="Multi-tenant SaaS Search API",
+    version="2.0.0",
+    default_response_class=ORJSONResponse,
+)
+
+# 📝 File d'attente des QueryLog: l'écriture SQLite (fsync) sort du chemin
+# critique de /query; les logs sont insérés par lots par une tâche de fond
+# (1 fsync par lot au lieu d'1 par requête).
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL = 0.5  # secondes d'attente max avant flush d'un lot partiel
+log_queue: asyncio.Queue[dict] = asyncio.Queue()
+
+def _flush_query_logs(rows: list[dict]) -> None:
+    """Insère un lot de QueryLog dans sa propre session (1 commit).
+
+    Insert Core en executemany: pas d'objets ORM ni d'identity map à
+    construire pour de simples lignes de log, juste un bind de
+    paramètres par ligne dans une seule instruction.
+    """
+    if not rows:
+        return
+    db = SessionLocal()
+    try:
+        db.execute(insert(QueryLog), rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Échec d'écriture d'un lot de {len(rows)} QueryLog: {e}")
+    finally:
+        db.close()
+
+async def _log_writer():
+    """Tâche de fond: draine log_queue par lots de LOG_BATCH_SIZE max.
+
+    Attend le premier log, puis complète le lot pendant au plus
+    LOG_FLUSH_INTERVAL avant d'écrire. L'ordre par tenant est préservé
+    car created_at est fixé à l'enfilage, pas au flush.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        rows = [await log_queue.get()]
+        deadline = loop.time() + LOG_FLUSH_INTERVAL
+        while len(rows) < LOG_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                rows.append(await asyncio.wait_for(log_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        await asyncio.to_thread(_flush_query_logs, rows)
+
+async def _optimize_db_loop(interval_seconds: float = 900):
+    """Tâche de fond: PRAGMA optimize toutes les 15 minutes.
+
+    Maintient les statistiques du query planner SQLite à jour
+    (recommandé par la doc SQLite pour les bases long-running).
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            optimize_db()
+        except Exception as e:
+            print(f"⚠️ PRAGMA optimize a échoué: {e}")
 
 # Événement de démarrage: initialiser la base de données
 @app.on_event("startup")
 async def startup_event():
     """Initialise la base de données au démarrage de l'application."""
     init_db()
+    # Preload the two tenants (optional, but nice for faster first request)
+    # Chargement concurrent: le cold start coûte max(load) et non sum(load)
+    await asyncio.to_thread(get_search_engine().preload, ["tenantA", "tenantB"])
+    asyncio.create_task(_optimize_db_loop())
+    asyncio.create_task(_log_writer())
+    # Coalesceur d'embeddings de queries (lots partagés entre requêtes)
+    from .services.embeddings import query_embedder
+    query_embedder.start()
     print("✅ Application démarrée avec BDD SQLite et LLM Ollama")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Draine les QueryLog encore en file et ferme le client Ollama."""
+    pending: list[dict] = []
+    while True:
+        try:
+            pending.append(log_queue.get_nowait())
+        except asyncio.QueueEmpty:
+            break
+    _flush_query_logs(pending)
+    # Fermer le client httpx partagé des appels LLM async
+    from .services.llm import llm_service
+    await llm_service.aclose()
+
 # For Streamlit local dev
 app.add_middleware(
     CORSMiddleware,
@@ -47,12 +146,17 @@ class QueryRequest(BaseModel):
     question: str = Field(..., min_length=1, max_length=2000)
 
 class Source(BaseModel):
+    # frozen: modèle de sortie immuable, validation précompilée par Pydantic v2
+    model_config = ConfigDict(frozen=True)
+
     doc_id: str
     chunk_id: int
     score: float
     excerpt: str
 
 class QueryResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     tenant_id: str
     answer: str | None
     sources: list[Source]
@@ -102,17 +206,14 @@ def get_tenant_stats(
     if authenticated_tenant != tenant_id:
         raise HTTPException(status_code=403, detail="Access denied to this tenant's stats")
     
-    # Récupérer les statistiques
-    total_queries = db.query(QueryLog).filter(QueryLog.tenant_id == tenant_id).count()
-    llm_queries = db.query(QueryLog).filter(
-        QueryLog.tenant_id == tenant_id,
-        QueryLog.query_metadata.contains('"llm_used": true')
-    ).count()
-    no_answer_queries = db.query(QueryLog).filter(
-        QueryLog.tenant_id == tenant_id,
-        QueryLog.no_answer == True
-    ).count()
-    
+    # Récupérer les statistiques: un seul scan agrégé au lieu de trois
+    # COUNT() séparés (dont un LIKE non indexable sur le JSON)
+    total_queries, llm_queries, no_answer_queries = db.query(
+        func.count(QueryLog.id),
+        func.coalesce(func.sum(case((QueryLog.llm_used, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((QueryLog.no_answer, 1), else_=0)), 0),
+    ).filter(QueryLog.tenant_id == tenant_id).one()
+
     # Récupérer les dernières requêtes
     recent_queries = db.query(QueryLog).filter(
         QueryLog.tenant_id == tenant_id
@@ -138,7 +239,7 @@ def get_tenant_stats(
     }
 
 @app.post("/query", response_model=QueryResponse)
-def query(
+async def query(
     req: QueryRequest, 
     x_api_key: str | None = Header(default=None, alias="X-API-KEY"),
     db: Session = Depends(get_db)
@@ -164,28 +265,33 @@ def query(
     tenant_id = get_tenant_or_401(x_api_key)
     
     # 📊 Mise à jour des statistiques d'utilisation de l'API Key
-    api_usage = db.query(APIKeyUsage).filter(
-        APIKeyUsage.tenant_id == tenant_id,
-        APIKeyUsage.api_key == x_api_key
-    ).first()
-    
-    if api_usage:
-        api_usage.request_count += 1
-        api_usage.last_used_at = datetime.now()
-    else:
-        api_usage = APIKeyUsage(
-            tenant_id=tenant_id,
-            api_key=x_api_key,
-            request_count=1,
-            last_used_at=datetime.now()
+    # Upsert en une seule instruction (pas de SELECT préalable). Exécuté
+    # + committé dans le threadpool: un commit SQLite contendu (jusqu'à
+    # busy_timeout=30s) ne doit jamais geler l'event loop.
+    def _bump_usage() -> None:
+        db.execute(
+            sqlite_insert(APIKeyUsage)
+            .values(
+                tenant_id=tenant_id,
+                api_key=x_api_key,
+                request_count=1,
+                last_used_at=func.now(),  # horodaté par SQLite, en UTC
+            )
+            .on_conflict_do_update(
+                index_elements=["tenant_id", "api_key"],
+                set_={
+                    "request_count": APIKeyUsage.request_count + 1,
+                    "last_used_at": func.now(),
+                },
+            )
         )
-        db.add(api_usage)
-    
-    db.commit()
+        db.commit()
 
     # 📚 Étape 2: Chargement de l'index isolé du tenant
-    idx = search_engine.get(tenant_id)
-    hits = idx.search(req.question, top_k=3)
+    idx = get_search_engine().get(tenant_id)
+    # search_async: l'embedding de la query est coalescé avec les autres
+    # requêtes en vol, et l'event loop reste libre pendant le scoring
+    hits = await idx.search_async(req.question, top_k=3)
 
     # 🛡️ Étape 3: Filtrage anti-hallucination (seuil de confiance)
     MIN_SCORE = 0.12
@@ -195,19 +301,20 @@ def query(
         # Pas de résultats pertinents
         execution_time_ms = (time.time() - start_time) * 1000
         
-        # Logging dans la base de données
-        query_log = QueryLog(
-            tenant_id=tenant_id,
-            question=req.question,
-            answer=None,
-            no_answer=True,
-            sources_count=0,
-            execution_time_ms=execution_time_ms,
-            query_metadata={"min_score": MIN_SCORE}
-        )
-        db.add(query_log)
-        db.commit()
-        
+        # Compteur APIKeyUsage écrit hors event loop; le log part en file
+        await run_in_threadpool(_bump_usage)
+        log_queue.put_nowait({
+            "tenant_id": tenant_id,
+            "question": req.question,
+            "answer": None,
+            "no_answer": True,
+            "llm_used": False,
+            "sources_count": 0,
+            "execution_time_ms": execution_time_ms,
+            "created_at": datetime.utcnow(),
+            "query_metadata": {"min_score": MIN_SCORE},
+        })
+
         return QueryResponse(
             tenant_id=tenant_id,
             answer=None,
@@ -217,7 +324,7 @@ def query(
         )
 
     # 🤖 Étape 4: Génération de réponse avec LLM (Ollama + Mistral)
-    answer, llm_used = build_llm_answer(hits, req.question)
+    answer, llm_used = await build_llm_answer_async(hits, req.question)
     
     # 📊 Étape 5: Préparation des sources
     sources = [
@@ -233,15 +340,19 @@ def query(
     # Calcul du temps d'exécution
     execution_time_ms = (time.time() - start_time) * 1000
     
-    # 💾 Étape 6: Logging dans la base de données
-    query_log = QueryLog(
-        tenant_id=tenant_id,
-        question=req.question,
-        answer=answer,
-        no_answer=False,
-        sources_count=len(sources),
-        execution_time_ms=execution_time_ms,
-        query_metadata={
+    # 💾 Étape 6: Logging asynchrone — la requête n'attend pas le fsync,
+    # le lot est écrit par la tâche de fond _log_writer
+    await run_in_threadpool(_bump_usage)  # compteur APIKeyUsage uniquement
+    log_queue.put_nowait({
+        "tenant_id": tenant_id,
+        "question": req.question,
+        "answer": answer,
+        "no_answer": False,
+        "llm_used": llm_used,
+        "sources_count": len(sources),
+        "execution_time_ms": execution_time_ms,
+        "created_at": datetime.utcnow(),
+        "query_metadata": {
             "llm_used": llm_used,
             "min_score": MIN_SCORE,
             "sources": [
@@ -252,11 +363,9 @@ def query(
                 }
                 for s in sources
             ]
-        }
-    )
-    db.add(query_log)
-    db.commit()
-    
+        },
+    })
+
     return QueryResponse(
         tenant_id=tenant_id,
         answer=answer,
@@ -303,20 +412,38 @@ async def upload_document(
     
     # 💾 Étape 4: Sauvegarde du fichier
     file_path = os.path.join(tenant_dir, file.filename)
-    
-    # Lire le contenu du fichier
-    content = await file.read()
-    
+    # Écriture dans un fichier temporaire (suffixe .part: ignoré par les
+    # scans .txt), promu sur la cible par os.replace seulement après
+    # validation — un upload invalide ne peut pas écraser un document
+    # existant déjà indexé
+    tmp_path = file_path + ".part"
+
+    # Copier le flux vers le disque par blocs de 64 KB: la RSS reste
+    # constante quelle que soit la taille du fichier (pas de `bytes`
+    # intermédiaire de la taille complète de l'upload)
+    def _save_upload() -> int:
+        try:
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(file.file, f, length=65536)
+        except Exception:
+            # Copie interrompue (déconnexion client, disque plein): ne
+            # pas laisser traîner de .part orphelin dans le répertoire
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return os.path.getsize(tmp_path)
+
+    file_size = await run_in_threadpool(_save_upload)
+
     # Vérifier que le contenu n'est pas vide
-    if not content or len(content.strip()) == 0:
+    if file_size == 0:
+        os.remove(tmp_path)
         raise HTTPException(
             status_code=400,
             detail="File is empty"
         )
-    
-    # Sauvegarder le fichier
-    with open(file_path, "wb") as f:
-        f.write(content)
+
+    os.replace(tmp_path, file_path)
     
     # 🗄️ Étape 5: Enregistrement dans la base de données
     # Vérifier si le document existe déjà
@@ -327,33 +454,30 @@ async def upload_document(
     
     if existing_doc:
         # Mettre à jour le document existant
-        existing_doc.updated_at = datetime.utcnow()
+        existing_doc.updated_at = func.now()
         existing_doc.chunks_count = 0  # Sera recalculé lors de la réindexation
     else:
-        # Créer une nouvelle entrée
+        # Créer une nouvelle entrée (indexed_at/updated_at: server_default)
         new_doc = TenantDocument(
             tenant_id=tenant_id,
             doc_id=file.filename,
             doc_path=file_path,
             chunks_count=0,  # Sera calculé lors de la réindexation
-            indexed_at=datetime.utcnow()
         )
         db.add(new_doc)
     
     db.commit()
     
-    # 🔄 Étape 6: Réindexation du tenant
+    # 🔄 Étape 6: Réindexation du tenant (incrémentale si possible)
     try:
-        search_engine.reload_tenant(tenant_id)
+        search_engine = get_search_engine()
+        search_engine.add_document(tenant_id, file_path)
         
         # Calculer le nombre de chunks pour ce document
         chunks_count = 0
         tenant_index = search_engine.get_tenant_index(tenant_id)
         if tenant_index:
-            chunks_count = sum(
-                1 for chunk in tenant_index.chunks
-                if chunk.doc_id == file.filename
-            )
+            chunks_count = tenant_index.doc_ids.count(file.filename)
         
         # Mettre à jour le nombre de chunks
         doc = db.query(TenantDocument).filter(
@@ -370,7 +494,7 @@ async def upload_document(
             "tenant_id": tenant_id,
             "filename": file.filename,
             "chunks_count": chunks_count,
-            "file_size_bytes": len(content)
+            "file_size_bytes": file_size
         }
     except Exception as e:
         raise HTTPException(
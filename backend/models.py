@@ -4,7 +4,8 @@ Modèles SQLAlchemy pour la base de données
 from __future__ import annotations
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, JSON
+
+from sqlalchemy import Column, Index, Integer, String, Text, Float, Boolean, DateTime, JSON, func
 
 from .database import Base
 
@@ -14,15 +15,23 @@ class QueryLog(Base):
     Permet de tracer l'utilisation et détecter les anomalies.
     """
     __tablename__ = "query_logs"
-    
+    # Index composite: /stats filtre par tenant_id et trie par
+    # created_at DESC LIMIT 10 → simple range scan d'index, sans tri
+    __table_args__ = (
+        Index("ix_querylog_tenant_created", "tenant_id", "created_at"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     tenant_id = Column(String(50), nullable=False, index=True)
     question = Column(Text, nullable=False)
     answer = Column(Text, nullable=True)
     no_answer = Column(Boolean, default=False)
+    # Colonne dédiée (indexée) au lieu d'un LIKE sur le JSON de métadonnées
+    llm_used = Column(Boolean, default=False, index=True)
     sources_count = Column(Integer, default=0)
     execution_time_ms = Column(Float, nullable=True)  # Temps d'exécution en ms
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Horodatage calculé côté SQLite (UTC), pas d'allocation datetime Python
+    created_at = Column(DateTime, server_default=func.now(), index=True)
     
     # Métadonnées JSON (sources, scores, etc.)
     # Note: 'metadata' est réservé par SQLAlchemy, on utilise 'query_metadata'
@@ -44,8 +53,11 @@ class TenantDocument(Base):
     doc_id = Column(String(255), nullable=False)  # Nom du fichier
     doc_path = Column(String(500), nullable=False)
     chunks_count = Column(Integer, default=0)
-    indexed_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # default Python en plus du server_default: ce dernier est du DDL et
+    # ne s'applique pas aux tables créées avant la migration (insertions
+    # à NULL sinon sur une base mise à niveau)
+    indexed_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
     
     def __repr__(self):
         return f"<TenantDocument(id={self.id}, tenant={self.tenant_id}, doc={self.doc_id})>"
@@ -57,13 +69,19 @@ class APIKeyUsage(Base):
     Permet de monitorer l'activité et détecter les abus.
     """
     __tablename__ = "api_key_usage"
-    
+    # Index unique composite: cible du INSERT ... ON CONFLICT DO UPDATE
+    # dans /query (une seule écriture au lieu de SELECT + INSERT/UPDATE)
+    __table_args__ = (
+        Index("ix_apikey_tenant_key", "tenant_id", "api_key", unique=True),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     tenant_id = Column(String(50), nullable=False, index=True)
     api_key = Column(String(100), nullable=False, index=True)
     request_count = Column(Integer, default=0)
     last_used_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # default Python: voir TenantDocument (bases antérieures au DDL)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
     
     def __repr__(self):
         return f"<APIKeyUsage(id={self.id}, tenant={self.tenant_id}, requests={self.request_count})>"
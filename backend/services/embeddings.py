@@ -4,95 +4,222 @@ Pour la recherche sémantique (RAG)
 """
 from __future__ import annotations
 
+import asyncio
+import math
 import os
 import requests
 import numpy as np
+from requests.adapters import HTTPAdapter
 from typing import Optional
+from urllib3.util.retry import Retry
 
 # Configuration Ollama
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL", "mistral")
 
+# ⚡ Cache exact (model, text) -> embedding: une question répétée saute
+# l'aller-retour Ollama. Borné avec éviction du plus ancien; seuls les
+# succès sont mémorisés pour ne pas figer une panne transitoire.
+_EMBED_CACHE_MAX = 1024
+_embed_cache: dict[tuple[str, str], np.ndarray] = {}
+
+def _embed_cache_store(model: str, text: str, embedding: np.ndarray) -> None:
+    if len(_embed_cache) >= _EMBED_CACHE_MAX:
+        _embed_cache.pop(next(iter(_embed_cache)))
+    _embed_cache[(model, text)] = embedding
+
 class OllamaEmbeddings:
     """Service d'embeddings avec Ollama."""
     
+    # Taille des sous-lots envoyés à /api/embed (borne la mémoire serveur)
+    BATCH_SIZE = 64
+
     def __init__(self, model: str = OLLAMA_EMBEDDING_MODEL, base_url: str = OLLAMA_BASE_URL):
         self.model = model
         self.base_url = base_url
         self.timeout = 30
-    
+        # Session partagée: keep-alive TCP entre les sous-lots au lieu
+        # d'une nouvelle connexion par appel, avec pool de connexions et
+        # retry court sur les erreurs de connexion
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.1),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
     def is_available(self) -> bool:
         """Vérifie si Ollama est disponible."""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
             return response.status_code == 200
         except Exception:
             return False
-    
+
     def embed_text(self, text: str) -> Optional[np.ndarray]:
         """
-        Génère un embedding pour un texte.
-        
+        Génère un embedding pour un texte (avec cache exact).
+
         Args:
             text: Texte à embedder
-        
+
         Returns:
             Vecteur numpy ou None si erreur
         """
-        try:
-            response = requests.post(
-                f"{self.base_url}/api/embeddings",
-                json={
-                    "model": self.model,
-                    "prompt": text
-                },
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 200:
-                embedding = response.json().get("embedding")
-                if embedding:
-                    return np.array(embedding, dtype=np.float32)
-            else:
-                print(f"⚠️ Erreur embeddings Ollama: {response.status_code}")
-                return None
-                
-        except Exception as e:
-            print(f"⚠️ Erreur génération embeddings: {e}")
+        # Requête triviale: aucun aller-retour HTTP pour du vide
+        if not text or not text.strip():
             return None
-    
+
+        key = (self.model, text)
+        cached = _embed_cache.get(key)
+        if cached is not None:
+            return cached
+
+        embedding = self.embed_batch([text])[0]
+        if embedding is not None:
+            _embed_cache_store(self.model, text, embedding)
+        return embedding
+
     def embed_batch(self, texts: list[str]) -> list[Optional[np.ndarray]]:
         """
         Génère des embeddings pour plusieurs textes.
-        
+
+        ⚡ Un POST /api/embed par sous-lot de BATCH_SIZE textes (endpoint
+        batch natif d'Ollama): le modèle fait une passe sur tout le lot
+        au lieu d'un aller-retour HTTP + forward par texte.
+
         Args:
             texts: Liste de textes à embedder
-        
+
         Returns:
-            Liste de vecteurs numpy
+            Liste de vecteurs numpy (None pour les échecs)
         """
-        return [self.embed_text(text) for text in texts]
+        embeddings: list[Optional[np.ndarray]] = []
+        for start in range(0, len(texts), self.BATCH_SIZE):
+            batch = texts[start:start + self.BATCH_SIZE]
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/api/embed",
+                    json={"model": self.model, "input": batch},
+                    timeout=self.timeout
+                )
+
+                if response.status_code == 200:
+                    vectors = response.json().get("embeddings") or []
+                    embeddings.extend(
+                        np.asarray(v, dtype=np.float32) if v else None
+                        for v in vectors
+                    )
+                    # Compléter si le serveur renvoie moins que demandé
+                    embeddings.extend([None] * (len(batch) - len(vectors)))
+                else:
+                    print(f"⚠️ Erreur embeddings Ollama: {response.status_code}")
+                    embeddings.extend([None] * len(batch))
+
+            except Exception as e:
+                print(f"⚠️ Erreur génération embeddings: {e}")
+                embeddings.extend([None] * len(batch))
+        return embeddings
     
     def cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """
         Calcule la similarité cosinus entre deux vecteurs.
-        
+
+        ⚡ np.vdot (BLAS sdot sur float32 contigus) + un seul sqrt au
+        lieu de deux np.linalg.norm — la moitié du coût de dispatch pour
+        des vecteurs de cette taille.
+
         Args:
             vec1: Premier vecteur
             vec2: Deuxième vecteur
-        
+
         Returns:
             Score de similarité (0 à 1)
         """
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
-        
-        if norm1 == 0 or norm2 == 0:
+        dot_product = float(np.vdot(vec1, vec2))
+        norm_product = float(np.vdot(vec1, vec1)) * float(np.vdot(vec2, vec2))
+
+        if norm_product == 0.0:
             return 0.0
-        
-        return float(dot_product / (norm1 * norm2))
+
+        return dot_product / math.sqrt(norm_product)
+
+
+class QueryEmbedder:
+    """Coalesceur d'embeddings de requêtes.
+
+    ⚡ Les questions arrivées dans une petite fenêtre (WINDOW secondes,
+    ou MAX_BATCH en attente) partent dans un seul POST /api/embed: le
+    coût HTTP + forward du modèle est amorti sur les requêtes
+    concurrentes au lieu d'un aller-retour Ollama par utilisateur.
+    Même schéma file + tâche de fond que le _log_writer de main.
+    """
+
+    WINDOW = 0.02  # secondes d'attente max pour compléter un lot
+    MAX_BATCH = 32
+
+    def __init__(self, service: OllamaEmbeddings):
+        self.service = service
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Démarre la tâche de fond (à appeler depuis le startup FastAPI)."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._worker())
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """Embedding de la query, coalescé avec les requêtes concurrentes.
+
+        Sans tâche démarrée (tests, scripts), retombe sur un appel
+        direct dans un thread — même résultat, sans coalescence.
+        """
+        cached = _embed_cache.get((self.service.model, text))
+        if cached is not None:
+            return cached
+        if not self.running:
+            return await asyncio.to_thread(self.service.embed_text, text)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _worker(self) -> None:
+        """Tâche de fond: draine la file par lots de MAX_BATCH max."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.WINDOW
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = await asyncio.to_thread(self.service.embed_batch, texts)
+            except Exception as e:
+                print(f"⚠️ Échec d'un lot d'embeddings de queries: {e}")
+                embeddings = [None] * len(texts)
+            for (text, future), embedding in zip(batch, embeddings):
+                if embedding is not None:
+                    _embed_cache_store(self.service.model, text, embedding)
+                if not future.done():
+                    future.set_result(embedding)
 
 
 # Instance globale du service d'embeddings
 embeddings_service = OllamaEmbeddings()
+
+# Coalesceur global des embeddings de queries (démarré au startup FastAPI)
+query_embedder = QueryEmbedder(embeddings_service)
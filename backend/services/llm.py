@@ -4,11 +4,17 @@ Génération de réponses contextuelles basées sur les documents trouvés
 """
 from __future__ import annotations
 
+import json
 import os
+import httpx
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from typing import Iterator, Optional
+from urllib3.util.retry import Retry
 
 # URL locale d'Ollama (installer avec: ollama pull mistral)
+# 💡 Pour servir plusieurs requêtes LLM en parallèle, configurer côté Ollama:
+#    OLLAMA_NUM_PARALLEL=4 et OLLAMA_MAX_LOADED_MODELS=1
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
 
@@ -19,57 +25,162 @@ class OllamaLLM:
         self.model = model
         self.base_url = base_url
         self.timeout = 60  # secondes
-    
+        # Session partagée avec pool de connexions: pas de handshake
+        # TCP par appel, et retry court sur les erreurs de connexion
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.1),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Client httpx partagé pour les chemins async (celui qui sert
+        # /query): créé paresseusement dans l'event loop au premier
+        # appel, fermé au shutdown via aclose()
+        self._async_client: httpx.AsyncClient | None = None
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Client httpx partagé: keep-alive entre les requêtes async.
+
+        Un AsyncClient jetable par appel payait une connexion TCP neuve
+        à chaque requête — exactement ce que le pool côté sync évite.
+        """
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=8),
+            )
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """Ferme le client async partagé (à appeler au shutdown)."""
+        if self._async_client is not None and not self._async_client.is_closed:
+            await self._async_client.aclose()
+
     def is_available(self) -> bool:
         """Vérifie si Ollama est disponible."""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
             return response.status_code == 200
         except Exception:
             return False
-    
-    def generate(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
+
+    async def is_available_async(self) -> bool:
+        """Vérifie si Ollama est disponible (sans bloquer l'event loop)."""
+        try:
+            response = await self._get_async_client().get(
+                f"{self.base_url}/api/tags", timeout=5
+            )
+            return response.status_code == 200
+        except Exception:
+            return False
+
+    def _build_payload(self, prompt: str, system_prompt: Optional[str] = None,
+                       stream: bool = False) -> dict:
+        """Construit le payload /api/generate (commun sync/async)."""
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.3,  # Réponses plus déterministes
+                "top_p": 0.9,
+                "top_k": 40,
+            }
+        }
+        if system_prompt:
+            payload["system"] = system_prompt
+        return payload
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                 stream: bool = False) -> Optional[str] | Iterator[str]:
         """
         Génère une réponse avec Ollama.
-        
+
         Args:
             prompt: Question utilisateur + contexte
             system_prompt: Instructions système (optionnel)
-        
+            stream: Si True, retourne un générateur de tokens au lieu
+                d'attendre la réponse complète (latence perçue réduite)
+
         Returns:
-            Réponse générée ou None si erreur
+            Réponse générée (None si erreur), ou générateur de tokens
+            en mode stream
         """
+        if stream:
+            return self._generate_stream(prompt, system_prompt)
+
         try:
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.3,  # Réponses plus déterministes
-                    "top_p": 0.9,
-                    "top_k": 40,
-                }
-            }
-            
-            if system_prompt:
-                payload["system"] = system_prompt
-            
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
-                json=payload,
+                json=self._build_payload(prompt, system_prompt),
                 timeout=self.timeout
             )
-            
+
             if response.status_code == 200:
                 return response.json().get("response", "").strip()
             else:
                 print(f"Erreur Ollama: {response.status_code}")
                 return None
-                
+
         except Exception as e:
             print(f"Erreur génération LLM: {e}")
             return None
-    
+
+    def _generate_stream(self, prompt: str, system_prompt: Optional[str]) -> Iterator[str]:
+        """Générateur de tokens: itère les lignes JSON de /api/generate.
+
+        Ollama renvoie une ligne JSON par token avec le champ `response`;
+        chaque token est produit dès réception au lieu d'attendre la fin
+        de la génération.
+        """
+        try:
+            with self.session.post(
+                f"{self.base_url}/api/generate",
+                json=self._build_payload(prompt, system_prompt, stream=True),
+                timeout=self.timeout,
+                stream=True,
+            ) as response:
+                if response.status_code != 200:
+                    print(f"Erreur Ollama: {response.status_code}")
+                    return
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    token = data.get("response")
+                    if token:
+                        yield token
+                    if data.get("done"):
+                        break
+        except Exception as e:
+            print(f"Erreur génération LLM (stream): {e}")
+
+    async def generate_async(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """
+        Génère une réponse avec Ollama sans bloquer l'event loop.
+
+        Identique à `generate` mais en httpx.AsyncClient: pendant le
+        calcul du modèle (centaines de ms à plusieurs secondes), FastAPI
+        peut servir d'autres requêtes au lieu d'occuper un worker thread.
+        """
+        try:
+            response = await self._get_async_client().post(
+                f"{self.base_url}/api/generate",
+                json=self._build_payload(prompt, system_prompt),
+            )
+
+            if response.status_code == 200:
+                return response.json().get("response", "").strip()
+            else:
+                print(f"Erreur Ollama: {response.status_code}")
+                return None
+
+        except Exception as e:
+            print(f"Erreur génération LLM: {e}")
+            return None
+
     def build_rag_answer(self, question: str, context_chunks: list[str]) -> Optional[str]:
         """
         Construit une réponse RAG basée sur les chunks récupérés.
@@ -86,15 +197,42 @@ class OllamaLLM:
         Returns:
             Réponse générée ou None si erreur
         """
-        if not context_chunks:
+        # Contexte vide (liste vide ou chunks blancs): pas d'appel LLM
+        if not any(chunk.strip() for chunk in context_chunks):
             return None
-        
+
+        prompt, system_prompt = self._build_rag_prompts(question, context_chunks)
+        return self.generate(prompt, system_prompt)
+
+    def build_rag_answer_stream(self, question: str, context_chunks: list[str]) -> Iterator[str]:
+        """Variante streaming de `build_rag_answer`: générateur de tokens.
+
+        À brancher sur une StreamingResponse FastAPI: le premier token
+        part dès qu'Ollama le produit au lieu d'attendre la génération
+        complète.
+        """
+        if not any(chunk.strip() for chunk in context_chunks):
+            return iter(())
+
+        prompt, system_prompt = self._build_rag_prompts(question, context_chunks)
+        return self.generate(prompt, system_prompt, stream=True)
+
+    async def build_rag_answer_async(self, question: str, context_chunks: list[str]) -> Optional[str]:
+        """Variante asynchrone de `build_rag_answer` (mêmes prompts)."""
+        if not any(chunk.strip() for chunk in context_chunks):
+            return None
+
+        prompt, system_prompt = self._build_rag_prompts(question, context_chunks)
+        return await self.generate_async(prompt, system_prompt)
+
+    def _build_rag_prompts(self, question: str, context_chunks: list[str]) -> tuple[str, str]:
+        """Construit les prompts RAG (partagés entre sync et async)."""
         # Construction du contexte
         context = "\n\n---\n\n".join([
-            f"Document {i+1}:\n{chunk}" 
+            f"Document {i+1}:\n{chunk}"
             for i, chunk in enumerate(context_chunks)
         ])
-        
+
         # System prompt strict pour éviter les hallucinations
         system_prompt = """Tu es un assistant documentaire pour une entreprise SaaS multi-tenant.
 
@@ -113,7 +251,7 @@ Question: {question}
 
 Réponds à la question en te basant STRICTEMENT sur les documents ci-dessus."""
 
-        return self.generate(prompt, system_prompt)
+        return prompt, system_prompt
 
 
 # Instance globale du service LLM
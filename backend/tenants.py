@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import functools
+import hashlib
+import os
 from dataclasses import dataclass
 
 @dataclass(frozen=True)
@@ -20,12 +23,35 @@ TENANTS = {
     "tenantB_key": Tenant(id="tenantB", api_key="tenantB_key"),
 }
 
+# 🔒 Secret serveur pour le hachage keyed des clés API (en production:
+# variable d'environnement obligatoire, pas de valeur par défaut)
+SERVER_SECRET = os.getenv("SERVER_SECRET", "dev-secret-change-me").encode("utf-8")
+
+def _key_digest(api_key: str) -> bytes:
+    """Empreinte keyed-blake2b (PRF) d'une clé API."""
+    return hashlib.blake2b(
+        api_key.encode("utf-8"), key=SERVER_SECRET, digest_size=16
+    ).digest()
+
+# Table de résolution par empreinte, précalculée à l'import: le chemin
+# chaud ne compare jamais les clés en clair — toute comparaison porte sur
+# des digests keyed, donc le timing ne révèle rien de la clé attendue
+TENANTS_BLAKE = {_key_digest(k): tenant for k, tenant in TENANTS.items()}
+
+@functools.lru_cache(maxsize=4096)
 def resolve_tenant(api_key: str | None) -> Tenant | None:
     """Résout un tenant depuis sa clé API.
-    
+
     🔑 Point d'entrée de l'authentification multi-tenant.
     Retourne None si la clé est invalide/absente.
+
+    La clé entrante est hachée (blake2b keyed, implémentation C) puis
+    cherchée dans TENANTS_BLAKE: pas de comparaison de clés en clair.
+
+    ⚡ Mise en cache LRU: appelé sur CHAQUE requête, le résultat est
+    immuable (dataclass frozen). Si la config TENANTS devient dynamique,
+    appeler `resolve_tenant.cache_clear()` après rechargement.
     """
     if not api_key:
         return None
-    return TENANTS.get(api_key)
+    return TENANTS_BLAKE.get(_key_digest(api_key))
@@ -0,0 +1,89 @@
+"""Tests de l'index de recherche : ajout incrémental et cache disque."""
+import hashlib
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from backend.search import TenantIndex
+
+
+def _write_doc(tenant_dir, name, text):
+    (tenant_dir / name).write_text(text, encoding="utf-8")
+
+
+def _fake_embed_batch(texts):
+    """Embeddings déterministes dérivés du texte (aucun appel Ollama)."""
+    vectors = []
+    for text in texts:
+        seed = int.from_bytes(
+            hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest(), "big"
+        )
+        vectors.append(np.random.default_rng(seed).normal(size=16).astype(np.float32))
+    return vectors
+
+
+@pytest.fixture
+def tenant_dir(tmp_path):
+    d = tmp_path / "tenantX"
+    d.mkdir()
+    _write_doc(d, "doc1.txt", "La procédure de résiliation dure trente jours ouvrés.")
+    _write_doc(d, "doc2.txt", "Le contrat responsabilité civile couvre les dommages matériels.")
+    return d
+
+
+def test_add_document_incremental_tfidf(tenant_dir):
+    """Test: ajout incrémental d'un document en mode TF-IDF."""
+    idx = TenantIndex("tenantX", str(tenant_dir), use_embeddings=False)
+    assert sorted(set(idx.doc_ids)) == ["doc1.txt", "doc2.txt"]
+
+    _write_doc(tenant_dir, "doc3.txt",
+               "La résiliation du contrat responsabilité civile prend trente jours.")
+    assert idx.add_document(str(tenant_dir / "doc3.txt")) is True
+
+    # Listes SoA cohérentes et matrice agrandie d'autant
+    assert len(idx.doc_ids) == len(idx.chunk_ids) == len(idx.texts)
+    assert idx.matrix.shape[0] == len(idx.texts)
+    # Le nouveau document est cherchable (termes du vocabulaire existant)
+    hits = idx.search("résiliation du contrat responsabilité")
+    assert "doc3.txt" in {h.chunk.doc_id for h in hits}
+
+
+def test_add_document_replacement_requires_rebuild(tenant_dir):
+    """Test: remplacer un doc déjà indexé → False (rebuild complet requis)."""
+    idx = TenantIndex("tenantX", str(tenant_dir), use_embeddings=False)
+    before = len(idx.texts)
+    assert idx.add_document(str(tenant_dir / "doc1.txt")) is False
+    # L'index n'a pas été modifié en attendant le rebuild de l'appelant
+    assert len(idx.texts) == before
+
+
+def test_disk_cache_round_trip(tenant_dir):
+    """Test: cache disque — sauvegarde, rechargement, invalidation mtime."""
+    with mock.patch(
+        "backend.services.embeddings.embeddings_service.is_available",
+        return_value=True,
+    ), mock.patch(
+        "backend.services.embeddings.embeddings_service.embed_batch",
+        side_effect=_fake_embed_batch,
+    ) as embed_batch:
+        first = TenantIndex("tenantX", str(tenant_dir))
+        assert first.emb_matrix is not None
+        calls_after_build = embed_batch.call_count
+        assert calls_after_build >= 1
+
+        # Second build: rechargé depuis le cache, aucun ré-embedding
+        second = TenantIndex("tenantX", str(tenant_dir))
+        assert embed_batch.call_count == calls_after_build
+        assert second.doc_ids == first.doc_ids
+        assert second.chunk_ids == first.chunk_ids
+        assert second.texts == first.texts
+        assert np.allclose(np.asarray(second.emb_matrix),
+                           np.asarray(first.emb_matrix))
+
+        # Document modifié → empreinte du corpus différente → rebuild
+        _write_doc(tenant_dir, "doc1.txt",
+                   "Texte modifié: nouvelle politique de résiliation anticipée.")
+        third = TenantIndex("tenantX", str(tenant_dir))
+        assert embed_batch.call_count > calls_after_build
+        assert any("modifié" in t for t in third.texts)
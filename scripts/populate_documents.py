@@ -5,6 +5,7 @@ from __future__ import annotations
 
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Ajouter le répertoire parent au path pour importer les modules backend
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -28,58 +29,59 @@ def populate_tenant_documents():
         
         # Liste des tenants
         tenants = ["tenantA", "tenantB"]
-        
+
+        # ⚡ Un seul SELECT pour tous les documents déjà en base, au lieu
+        # d'une requête d'existence par fichier
+        existing = set(db.query(TenantDocument.tenant_id, TenantDocument.doc_id).all())
+
+        def count_chunks(file_path: str) -> int:
+            """Lit le fichier et retourne son nombre de chunks."""
+            return len(_chunk_text(_read_text(file_path)))
+
+        new_docs: list[TenantDocument] = []
+
         for tenant_id in tenants:
             tenant_dir = os.path.join(data_dir, tenant_id)
-            
+
             if not os.path.isdir(tenant_dir):
                 print(f"⚠️  Répertoire {tenant_dir} non trouvé")
                 continue
-            
+
             print(f"\n📂 Traitement du tenant: {tenant_id}")
             print(f"   Répertoire: {tenant_dir}")
-            
-            # Parcourir tous les fichiers .txt du tenant
-            for filename in os.listdir(tenant_dir):
-                if not filename.lower().endswith(".txt"):
-                    continue
-                
-                file_path = os.path.join(tenant_dir, filename)
-                
-                # Vérifier si le document existe déjà dans la BD
-                existing_doc = db.query(TenantDocument).filter(
-                    TenantDocument.tenant_id == tenant_id,
-                    TenantDocument.doc_id == filename
-                ).first()
-                
-                if existing_doc:
-                    print(f"   ⏭️  {filename} (déjà en base)")
-                    continue
-                
-                # Lire le contenu du fichier
-                try:
-                    content = _read_text(file_path)
-                    
-                    # Chunker le texte pour compter les chunks
-                    chunks = _chunk_text(content)
-                    chunks_count = len(chunks)
-                    
-                    # Créer l'entrée dans la base de données
-                    tenant_doc = TenantDocument(
-                        tenant_id=tenant_id,
-                        doc_id=filename,
-                        doc_path=file_path,
-                        chunks_count=chunks_count
-                    )
-                    
-                    db.add(tenant_doc)
-                    db.commit()
-                    
-                    print(f"   ✅ {filename} ({chunks_count} chunks)")
-                    
-                except Exception as e:
-                    print(f"   ❌ Erreur avec {filename}: {e}")
-                    db.rollback()
+
+            # Fichiers .txt du tenant pas encore en base (os.scandir:
+            # type et chemin portés par le DirEntry, pas de stat en plus)
+            to_index: list[os.DirEntry] = []
+            with os.scandir(tenant_dir) as it:
+                for entry in sorted(it, key=lambda e: e.name):
+                    if not (entry.is_file() and entry.name.lower().endswith(".txt")):
+                        continue
+                    if (tenant_id, entry.name) in existing:
+                        print(f"   ⏭️  {entry.name} (déjà en base)")
+                        continue
+                    to_index.append(entry)
+
+            if not to_index:
+                continue
+
+            # ⚡ Lectures + comptage de chunks en parallèle (I/O-bound)
+            with ThreadPoolExecutor(max_workers=min(8, len(to_index))) as pool:
+                counts = list(pool.map(lambda e: count_chunks(e.path), to_index))
+
+            for entry, chunks_count in zip(to_index, counts):
+                new_docs.append(TenantDocument(
+                    tenant_id=tenant_id,
+                    doc_id=entry.name,
+                    doc_path=entry.path,
+                    chunks_count=chunks_count
+                ))
+                print(f"   ✅ {entry.name} ({chunks_count} chunks)")
+
+        # ⚡ Une seule transaction pour toutes les insertions
+        if new_docs:
+            db.bulk_save_objects(new_docs)
+            db.commit()
         
         # Afficher le résumé
         print("\n" + "="*60)